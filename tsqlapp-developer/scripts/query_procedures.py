@@ -7,115 +7,253 @@ This script helps ensure code generation uses only documented procedures.
 """
 
 import csv
+import os
+import pickle
 import sys
+from collections import namedtuple
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 
+# Bump whenever the shape of the cached catalog changes
+CACHE_VERSION = 6
 
-def load_procedures_csv(csv_path: str) -> List[Dict[str, str]]:
-    """Load the procedures CSV file into memory."""
-    procedures = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+# One parameter row of the catalog, restricted to the columns we use.
+# IsRequired and IsOutput are converted from 'Yes'/'No' to bool.
+Param = namedtuple('Param', [
+    'ProcedureName',
+    'ParameterName',
+    'ParameterType',
+    'ParameterSize',
+    'IsRequired',
+    'IsOutput',
+    'DefaultValue',
+])
+
+
+def iter_procedures_csv(csv_path: str, buffering: int = 1 << 20) -> Iterator[Param]:
+    """Stream parameter rows from the procedures CSV file."""
+    with open(csv_path, 'r', encoding='utf-8', newline='', buffering=buffering) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        col = {name: idx for idx, name in enumerate(header)}
+        name, param_name, param_type, size, required, output, default = (
+            col[field] for field in Param._fields
+        )
         for row in reader:
-            procedures.append(row)
-    return procedures
+            if row:
+                yield Param(
+                    row[name],
+                    row[param_name],
+                    row[param_type],
+                    row[size],
+                    row[required] == 'Yes',
+                    row[output] == 'Yes',
+                    row[default],
+                )
+
+
+def load_procedures_csv(
+    csv_path: str,
+) -> Tuple[List[Param], Dict[str, List[Param]], Dict[str, Set[str]]]:
+    """Load the procedures CSV file into memory.
+    
+    Returns the parameter rows, an index mapping each case-folded procedure
+    name to its parameter rows, and a trigram index mapping every
+    three-character substring of those names to the names containing it.
+    The parsed result is cached in a pickle next to the CSV and reused for
+    as long as it is not older than the CSV itself.
+    """
+    cache_path = csv_path + '.pkl'
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(csv_path):
+            with open(cache_path, 'rb') as f:
+                version, rows, trigrams = pickle.load(f)
+            if version == CACHE_VERSION:
+                procedures = list(map(Param._make, rows))
+                return procedures, _index_procedures(procedures), trigrams
+    except Exception:
+        # The cache is best effort: a missing, stale, corrupt or foreign
+        # pickle can fail in many ways, all of which mean reparse the CSV
+        pass
+    
+    procedures = list(iter_procedures_csv(csv_path))
+    index = _index_procedures(procedures)
+    
+    trigrams = {}
+    for name_folded in index:
+        for i in range(len(name_folded) - 2):
+            trigrams.setdefault(name_folded[i:i + 3], set()).add(name_folded)
+    
+    # Write to a temporary file and swap it in, so an interrupted or
+    # concurrent write never leaves a partial cache behind. Rows are stored
+    # as plain tuples so the cache does not depend on the module Param was
+    # loaded from (__main__ when run as a script).
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    rows = [tuple(p) for p in procedures]
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((CACHE_VERSION, rows, trigrams), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pickle.PicklingError):
+        # Read-only install location; caching is best effort
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return procedures, index, trigrams
+
+
+def _index_procedures(procedures: List[Param]) -> Dict[str, List[Param]]:
+    """Group parameter rows by case-folded procedure name."""
+    index = {}
+    name = None
+    for row in procedures:
+        # Case-fold each name once, not once per parameter row
+        if row.ProcedureName != name:
+            name = row.ProcedureName
+            params = index.setdefault(name.casefold(), [])
+        params.append(row)
+    return index
 
 
-def find_procedure(procedures: List[Dict[str, str]], proc_name: str) -> List[Dict[str, str]]:
+def find_procedure(index: Dict[str, List[Param]], proc_name: str) -> List[Param]:
     """Find all parameters for a specific procedure."""
-    return [p for p in procedures if p['ProcedureName'].lower() == proc_name.lower()]
+    return index.get(proc_name.casefold(), [])
 
 
-def search_procedures(procedures: List[Dict[str, str]], pattern: str) -> List[str]:
-    """Search for procedures matching a pattern."""
-    matches = set()
-    pattern_lower = pattern.lower()
-    for p in procedures:
-        if pattern_lower in p['ProcedureName'].lower():
-            matches.add(p['ProcedureName'])
-    return sorted(matches)
+def search_procedures(
+    index: Dict[str, List[Param]],
+    pattern: str,
+    trigrams: Optional[Dict[str, Set[str]]] = None,
+) -> List[str]:
+    """Search for procedures matching a pattern.
+    
+    With a trigram index only names sharing every trigram of the pattern
+    are substring-checked; shorter patterns scan all names.
+    """
+    pattern_folded = pattern.casefold()
+    candidates = index.keys()
+    if trigrams is not None and len(pattern_folded) >= 3:
+        postings = []
+        for i in range(len(pattern_folded) - 2):
+            names = trigrams.get(pattern_folded[i:i + 3])
+            if not names:
+                return []
+            postings.append(names)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+    return sorted(
+        index[name_folded][0].ProcedureName
+        for name_folded in candidates
+        if pattern_folded in name_folded
+    )
 
 
-def format_parameter_info(param: Dict[str, str]) -> str:
-    """Format parameter information for display."""
-    parts = [f"  @{param['ParameterName'].lstrip('@')}"]
-    
-    # Type and size
-    param_type = param['ParameterType']
-    size = param['ParameterSize']
-    if size and size != 'None' and size != '':
-        if size == 'MAX' or size == '-1':
-            parts.append(f"{param_type}(MAX)")
-        else:
-            parts.append(f"{param_type}({size})")
-    else:
-        parts.append(param_type)
+def _build_parameter_templates() -> Dict[int, str]:
+    """Precompute the format_parameter_info layout for every flag combination.
     
-    # Required/Optional
-    is_required = param['IsRequired'] == 'Yes'
-    parts.append("REQUIRED" if is_required else "optional")
+    Keys are bit masks: 1 = sized, 2 = MAX size, 4 = required, 8 = output,
+    16 = shows a default value.
+    """
+    templates = {}
+    for key in range(32):
+        parts = ["  @%s"]
+        if key & 2:
+            parts.append("%s(MAX)")
+        elif key & 1:
+            parts.append("%s(%s)")
+        else:
+            parts.append("%s")
+        parts.append("REQUIRED" if key & 4 else "optional")
+        if key & 8:
+            parts.append("OUTPUT")
+        if key & 16:
+            parts.append("default=%s")
+        templates[key] = " | ".join(parts)
+    return templates
+
+
+_PARAMETER_TEMPLATES = _build_parameter_templates()
+
+
+def format_parameter_info(param: Param) -> str:
+    """Format parameter information for display."""
+    size = param.ParameterSize
+    has_size = bool(size) and size != 'None'
+    size_is_max = has_size and (size == 'MAX' or size == '-1')
     
-    # Output
-    is_output = param['IsOutput'] == 'Yes'
-    if is_output:
-        parts.append("OUTPUT")
+    # Defaults are only shown for optional parameters
+    default = param.DefaultValue
+    has_default = bool(default) and default != 'None' and not param.IsRequired
     
-    # Default value
-    default = param.get('DefaultValue', 'None')
-    if default and default != 'None' and not is_required:
-        parts.append(f"default={default}")
+    key = (
+        has_size
+        | size_is_max << 1
+        | param.IsRequired << 2
+        | param.IsOutput << 3
+        | has_default << 4
+    )
     
-    return " | ".join(parts)
+    args = (param.ParameterName.lstrip('@'), param.ParameterType)
+    if has_size and not size_is_max:
+        args += (size,)
+    if has_default:
+        args += (default,)
+    return _PARAMETER_TEMPLATES[key] % args
 
 
-def display_procedure_info(proc_name: str, params: List[Dict[str, str]]):
+def display_procedure_info(proc_name: str, params: List[Param]):
     """Display complete procedure information."""
     if not params:
         print(f"\n❌ Procedure '{proc_name}' NOT FOUND in catalog")
         return
     
-    print(f"\n✅ Procedure: {proc_name}")
-    print("=" * 80)
+    # Collect the report and write it in one go
+    out = [f"\n✅ Procedure: {proc_name}", "=" * 80]
     
-    # Separate required and optional parameters
-    required = [p for p in params if p['IsRequired'] == 'Yes']
-    optional = [p for p in params if p['IsRequired'] != 'Yes']
+    # Separate required and optional parameters, collecting OUTPUT ones too
+    required, optional, output_params = [], [], []
+    for p in params:
+        (required if p.IsRequired else optional).append(p)
+        if p.IsOutput:
+            output_params.append(p)
     
     if required:
-        print("\nREQUIRED Parameters:")
+        out.append("\nREQUIRED Parameters:")
         for param in required:
-            print(format_parameter_info(param))
+            out.append(format_parameter_info(param))
     
     if optional:
-        print("\nOPTIONAL Parameters:")
+        out.append("\nOPTIONAL Parameters:")
         for param in optional:
-            print(format_parameter_info(param))
+            out.append(format_parameter_info(param))
     
     # Generate example usage
-    print("\nExample Usage:")
-    print("-" * 80)
+    out.append("\nExample Usage:")
+    out.append("-" * 80)
     
     # Declare variables for OUTPUT parameters
-    output_params = [p for p in params if p['IsOutput'] == 'Yes']
     for param in output_params:
-        param_name = param['ParameterName'].lstrip('@')
-        print(f"DECLARE @{param_name} NVARCHAR(MAX);")
+        param_name = param.ParameterName.lstrip('@')
+        out.append(f"DECLARE @{param_name} NVARCHAR(MAX);")
     
     if output_params:
-        print()
+        out.append("")
     
     # EXEC statement
-    print(f"EXEC {proc_name}")
+    out.append(f"EXEC {proc_name}")
     for i, param in enumerate(required):
-        param_name = param['ParameterName']
-        is_output = param['IsOutput'] == 'Yes'
+        param_name = param.ParameterName
+        is_output = param.IsOutput
         value = f"@{param_name.lstrip('@')}" if is_output else f"N'value'"
         suffix = " OUT" if is_output else ""
         comma = "," if i < len(required) - 1 or optional else ";"
-        print(f"    {param_name} = {value}{suffix}{comma}")
+        out.append(f"    {param_name} = {value}{suffix}{comma}")
     
-    print()
+    out.append("")
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def main():
@@ -138,8 +276,8 @@ def main():
         print(f"❌ CSV file not found: {csv_path}")
         sys.exit(1)
     
-    # Load procedures
-    procedures = load_procedures_csv(str(csv_path))
+    # Load procedures (served from the pickle cache when it is fresh)
+    procedures, index, trigrams = load_procedures_csv(str(csv_path))
     print(f"Loaded {len(procedures)} procedure parameter records")
     
     # Handle search mode
@@ -149,19 +287,19 @@ def main():
             sys.exit(1)
         
         pattern = sys.argv[2]
-        matches = search_procedures(procedures, pattern)
+        matches = search_procedures(index, pattern, trigrams)
         
         if not matches:
             print(f"\n❌ No procedures found matching '{pattern}'")
         else:
-            print(f"\n✅ Found {len(matches)} procedures matching '{pattern}':")
-            for proc in matches:
-                print(f"  - {proc}")
+            out = [f"\n✅ Found {len(matches)} procedures matching '{pattern}':"]
+            out.extend(f"  - {proc}" for proc in matches)
+            sys.stdout.write("\n".join(out) + "\n")
         return
     
     # Find specific procedure
     proc_name = sys.argv[1]
-    params = find_procedure(procedures, proc_name)
+    params = find_procedure(index, proc_name)
     display_procedure_info(proc_name, params)
 
 
@@ -9,107 +9,225 @@ Usage:
     python parse_url.py "https://domain/parent/789/child?ord=123,456"
 """
 
+import functools
 import sys
 import re
-from urllib.parse import urlparse, parse_qs, unquote
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+from urllib.parse import unquote_plus
 
+# scheme://domain/path;params?query#fragment -- every part is optional, so
+# this matches any string, just like urlparse. As there, leading whitespace
+# and control characters are skipped and ;params on the last path segment
+# are split off the path.
+_URL_RE = re.compile(
+    r'[\x00-\x20]*'
+    r'(?:[A-Za-z][A-Za-z0-9+.-]*:)?'
+    r'(?://(?P<domain>[^/?#]*))?'
+    r'(?P<path>[^?#]*?)'
+    r'(?:;[^/?#]*)?(?=[?#]|$)'
+    r'(?:\?(?P<query>[^#]*))?'
+)
 
-def parse_tsqlapp_url(url: str) -> dict:
+# The only query parameters TSQL.APP puts in its URLs
+_QUERY_RE = re.compile(r'(?:^|&)(ord|red|id)=([^&]+)')
+
+# One comma separated sort field in ord: a field id, 'd' suffix for descending
+_ORD_RE = re.compile(r'\s*(\d+)(d?)\s*')
+
+# Lookup query templates used by generate_queries
+_DESC_CARD = "Get card '%s'"
+_SQL_CARD = "SELECT id, name, tablename, basetable, reducer FROM api_card WHERE name = N'%s'"
+_DESC_SORT = "Get sort field %d (%s)"
+_SQL_SORT = "SELECT id, name, card_id FROM api_card_fields WHERE id = %d"
+_DESC_FILTER = "Get filter '%s'"
+_SQL_FILTER = "SELECT id, name, sql FROM api_card_actions WHERE card_id = @card_id AND name = N'%s' AND action = 'reducer'"
+_DESC_SELECTED = "Get selected record %d"
+_SQL_SELECTED = "SELECT * FROM {tablename} WHERE id = %d"
+_DESC_PARENT = "Get parent record %d"
+_SQL_PARENT = "SELECT * FROM {parent_tablename} WHERE id = %d"
+
+
+def _qs(s: str) -> str:
+    """Escape a value for use inside an N'...' SQL string literal."""
+    return s.replace("'", "''")
+
+
+@dataclass(frozen=True)
+class ParsedUrl:
+    """Components of a TSQL.APP URL.
+    
+    Survives pickling and copying, e.g. when returned from a worker process:
+    
+    >>> import copy, pickle
+    >>> url = parse_tsqlapp_url('https://d/orders/1/lines?ord=5d&id=7')
+    >>> pickle.loads(pickle.dumps(url)) == url == copy.deepcopy(url)
+    True
+    """
+    
+    # Declared by hand rather than with dataclass(slots=True), which needs
+    # Python 3.10; slots rule out field defaults, so every field is required
+    __slots__ = (
+        'domain',
+        'card',
+        'parent_id',
+        'child_card',
+        'sort_fields',
+        'filter',
+        'selected_id',
+    )
+    
+    domain: str
+    card: Optional[str]
+    parent_id: Optional[int]
+    child_card: Optional[str]
+    sort_fields: Tuple[Tuple[int, bool], ...]  # (field_id, is_desc)
+    filter: Optional[str]
+    selected_id: Optional[int]
+    
+    # pickle and copy restore slots with setattr, which the frozen
+    # __setattr__ rejects, so state is restored through object.__setattr__
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_tsqlapp_url(url: str) -> ParsedUrl:
     """Parse a TSQL.APP URL into its components."""
     
-    parsed = urlparse(url)
-    path_parts = [p for p in parsed.path.split('/') if p]
-    query = parse_qs(parsed.query)
+    return _parse_match(_URL_RE.match(url))
+
+
+def parse_urls(urls: Iterable[str]) -> Iterator[ParsedUrl]:
+    """Parse many TSQL.APP URLs, yielding one result per URL in order.
     
-    result = {
-        'domain': parsed.netloc,
-        'card': None,
-        'parent_id': None,
-        'child_card': None,
-        'sort_fields': [],
-        'filter': None,
-        'selected_id': None,
-    }
+    Bypasses the per-URL cache of parse_tsqlapp_url, which suits large
+    batches of mostly distinct URLs.
+    """
     
-    # Parse path: /card or /parent_card/parent_id/child_card
-    if len(path_parts) >= 1:
-        result['card'] = path_parts[0]
+    parse_match = _parse_match
+    for match in map(_URL_RE.match, urls):
+        yield parse_match(match)
+
+
+def _parse_match(
+    match: re.Match,
+    _int=int,
+    _unquote_plus=unquote_plus,
+    _query_findall=_QUERY_RE.findall,
+    _ord_fullmatch=_ORD_RE.fullmatch,
+    _ParsedUrl=ParsedUrl,
+) -> ParsedUrl:
+    """Build the parsed components from a _URL_RE match.
+    
+    The keyword defaults bind module globals and builtins once at
+    definition time so the body only uses fast local lookups; they are
+    not meant to be passed by callers.
+    """
+    
+    path = match.group('path').strip('/')
+    if '//' in path:
+        # Rare: drop empty segments so the slicing below sees one '/' each
+        path = '/'.join([segment for segment in path.split('/') if segment])
     
-    if len(path_parts) == 3:
-        # Child card context: /parent/id/child
-        result['card'] = path_parts[0]  # parent card
-        result['parent_id'] = int(path_parts[1])
-        result['child_card'] = path_parts[2]
+    # Values are form-encoded, like parse_qs decodes them; the first
+    # occurrence of each parameter wins
+    query = {}
+    for key, value in _query_findall(match.group('query') or ''):
+        if key not in query:
+            query[key] = _unquote_plus(value)
     
-    # Parse ord parameter (sorting)
+    card = None
+    parent_id = None
+    child_card = None
+    sort_fields = ()
+    filter_name = None
+    selected_id = None
+    
+    # Parse path: /card or /parent_card/parent_id/child_card
+    if path:
+        i1 = path.find('/')
+        if i1 == -1:
+            card = path
+        else:
+            card = path[:i1]
+            i2 = path.find('/', i1 + 1)
+            if i2 != -1 and path.find('/', i2 + 1) == -1:
+                # Child card context: /parent/id/child
+                parent_id = _int(path[i1 + 1:i2])
+                child_card = path[i2 + 1:]
+    
+    # Parse ord parameter (sorting) into (field_id, is_desc) pairs
     if 'ord' in query:
-        ord_value = query['ord'][0]
-        for field in ord_value.split(','):
-            field = field.strip()
-            if field.endswith('d'):
-                result['sort_fields'].append({
-                    'field_id': int(field[:-1]),
-                    'direction': 'DESC'
-                })
-            else:
-                result['sort_fields'].append({
-                    'field_id': int(field),
-                    'direction': 'ASC'
-                })
+        sort_fields = []
+        for token in query['ord'].split(','):
+            field = _ord_fullmatch(token)
+            if field is None:
+                raise ValueError(f"invalid sort field in ord: {token!r}")
+            sort_fields.append((_int(field.group(1)), field.group(2) == 'd'))
+        sort_fields = tuple(sort_fields)
     
     # Parse red parameter (filter/reducer)
     if 'red' in query:
-        result['filter'] = unquote(query['red'][0])
+        filter_name = query['red']
     
     # Parse id parameter (selected record)
     if 'id' in query:
-        result['selected_id'] = int(query['id'][0])
+        selected_id = _int(query['id'])
+    
+    return _ParsedUrl(
+        domain=match.group('domain') or '',
+        card=card,
+        parent_id=parent_id,
+        child_card=child_card,
+        sort_fields=sort_fields,
+        filter=filter_name,
+        selected_id=selected_id,
+    )
+
+
+def generate_queries_batch(parsed_iter: Iterable[ParsedUrl]) -> Iterator[Tuple[Tuple[str, str], ...]]:
+    """Generate the lookup queries for each parsed URL in turn.
+    
+    Like parse_urls, bypasses the cache of generate_queries.
+    """
     
-    return result
+    return map(generate_queries.__wrapped__, parsed_iter)
 
 
-def generate_queries(parsed: dict) -> list:
-    """Generate SQL queries to look up the URL components."""
+@functools.lru_cache(maxsize=1024)
+def generate_queries(parsed: ParsedUrl) -> Tuple[Tuple[str, str], ...]:
+    """Generate (description, sql) pairs to look up the URL components."""
     
     queries = []
     
     # Card lookup
-    card_name = parsed['child_card'] or parsed['card']
+    card_name = parsed.child_card or parsed.card
     if card_name:
-        queries.append({
-            'description': f"Get card '{card_name}'",
-            'sql': f"SELECT id, name, tablename, basetable, reducer FROM api_card WHERE name = N'{card_name}'"
-        })
+        queries.append((_DESC_CARD % card_name, _SQL_CARD % _qs(card_name)))
     
     # Sort field lookups
-    for sf in parsed['sort_fields']:
-        queries.append({
-            'description': f"Get sort field {sf['field_id']} ({sf['direction']})",
-            'sql': f"SELECT id, name, card_id FROM api_card_fields WHERE id = {sf['field_id']}"
-        })
+    for field_id, is_desc in parsed.sort_fields:
+        direction = 'DESC' if is_desc else 'ASC'
+        queries.append((_DESC_SORT % (field_id, direction), _SQL_SORT % field_id))
     
     # Filter lookup (requires card_id)
-    if parsed['filter']:
-        queries.append({
-            'description': f"Get filter '{parsed['filter']}'",
-            'sql': f"SELECT id, name, sql FROM api_card_actions WHERE card_id = @card_id AND name = N'{parsed['filter']}' AND action = 'reducer'"
-        })
+    if parsed.filter:
+        queries.append((_DESC_FILTER % parsed.filter, _SQL_FILTER % _qs(parsed.filter)))
     
     # Selected record (requires tablename)
-    if parsed['selected_id']:
-        queries.append({
-            'description': f"Get selected record {parsed['selected_id']}",
-            'sql': f"SELECT * FROM {{tablename}} WHERE id = {parsed['selected_id']}"
-        })
+    if parsed.selected_id:
+        queries.append((_DESC_SELECTED % parsed.selected_id, _SQL_SELECTED % parsed.selected_id))
     
     # Parent record (for child context)
-    if parsed['parent_id']:
-        queries.append({
-            'description': f"Get parent record {parsed['parent_id']}",
-            'sql': f"SELECT * FROM {{parent_tablename}} WHERE id = {parsed['parent_id']}"
-        })
+    if parsed.parent_id:
+        queries.append((_DESC_PARENT % parsed.parent_id, _SQL_PARENT % parsed.parent_id))
     
-    return queries
+    return tuple(queries)
 
 
 def main():
@@ -123,38 +241,41 @@ def main():
     try:
         parsed = parse_tsqlapp_url(url)
         
-        print("=" * 60)
-        print("TSQL.APP URL PARSER")
-        print("=" * 60)
-        print(f"\nURL: {url}\n")
+        # Collect the report and write it in one go
+        out = ["=" * 60, "TSQL.APP URL PARSER", "=" * 60]
+        out.append(f"\nURL: {url}\n")
         
-        print("PARSED COMPONENTS:")
-        print("-" * 40)
-        print(f"  Card:        {parsed['card']}")
+        out.append("PARSED COMPONENTS:")
+        out.append("-" * 40)
+        out.append(f"  Card:        {parsed.card}")
         
-        if parsed['child_card']:
-            print(f"  Parent ID:   {parsed['parent_id']}")
-            print(f"  Child Card:  {parsed['child_card']}")
+        if parsed.child_card:
+            out.append(f"  Parent ID:   {parsed.parent_id}")
+            out.append(f"  Child Card:  {parsed.child_card}")
         
-        if parsed['sort_fields']:
-            sort_str = ', '.join([f"{s['field_id']} {s['direction']}" for s in parsed['sort_fields']])
-            print(f"  Sort:        {sort_str}")
+        if parsed.sort_fields:
+            sort_str = ', '.join([
+                f"{field_id} {'DESC' if is_desc else 'ASC'}"
+                for field_id, is_desc in parsed.sort_fields
+            ])
+            out.append(f"  Sort:        {sort_str}")
         
-        if parsed['filter']:
-            print(f"  Filter:      {parsed['filter']}")
+        if parsed.filter:
+            out.append(f"  Filter:      {parsed.filter}")
         
-        if parsed['selected_id']:
-            print(f"  Selected ID: {parsed['selected_id']}")
+        if parsed.selected_id:
+            out.append(f"  Selected ID: {parsed.selected_id}")
         
-        print("\nSUGGESTED QUERIES:")
-        print("-" * 40)
+        out.append("\nSUGGESTED QUERIES:")
+        out.append("-" * 40)
         
         queries = generate_queries(parsed)
-        for i, q in enumerate(queries, 1):
-            print(f"\n{i}. {q['description']}")
-            print(f"   {q['sql']}")
+        for i, (description, sql) in enumerate(queries, 1):
+            out.append(f"\n{i}. {description}")
+            out.append(f"   {sql}")
         
-        print("\n" + "=" * 60)
+        out.append("\n" + "=" * 60)
+        sys.stdout.write("\n".join(out) + "\n")
         
     except Exception as e:
         print(f"Error parsing URL: {e}")